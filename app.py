@@ -1,9 +1,19 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, abort
 from flask_socketio import SocketIO, emit
 import sqlite3
 import os
+import re
+import gzip
+import hashlib
+import threading
 from datetime import datetime
 
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional; pages are still served gzip-compressed without it
+    brotli = None
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 socketio = SocketIO(app, cors_allowed_origins="*")
@@ -11,10 +21,88 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # Database setup
 DATABASE = 'library.db'
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Read replica
+# When enabled, read-only helpers query an in-memory copy of the database
+# instead of library.db, so they never wait on disk I/O or the writer's lock.
+# The copy is refreshed right after every write made by this app, and polled
+# every REPLICA_MAX_STALENESS seconds to pick up writes made elsewhere.
+READ_REPLICA = os.environ.get('READ_REPLICA', '0') == '1'
+REPLICA_MAX_STALENESS = float(os.environ.get('REPLICA_MAX_STALENESS', 1.0))
+if REPLICA_MAX_STALENESS <= 0:
+    raise ValueError('REPLICA_MAX_STALENESS must be a positive number of seconds')
+
+replica_lock = threading.Lock()
+replica_refresh_lock = threading.Lock()
+replica_holder = None
+replica_uri = None
+replica_generation = 0
+replica_watcher = None
+replica_data_version = None
+
+def refresh_read_replica():
+    global replica_holder, replica_uri, replica_generation
+    global replica_watcher, replica_data_version
+    
+    with replica_refresh_lock:
+        # data_version changes whenever any other connection commits, including
+        # the app's own write connections, so record the version this copy covers
+        if replica_watcher is None:
+            replica_watcher = sqlite3.connect(DATABASE, check_same_thread=False)
+        # Read it before copying so a commit racing the backup is picked up next poll
+        version = replica_watcher.execute('PRAGMA data_version').fetchone()[0]
+        
+        # Copy into a fresh shared-cache memory database so readers of the
+        # current copy are never blocked while the new one is being filled
+        replica_generation += 1
+        uri = f'file:library_replica_{replica_generation}?mode=memory&cache=shared'
+        holder = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(DATABASE)
+        try:
+            source.backup(holder)
+        finally:
+            source.close()
+        
+        with replica_lock:
+            old_holder = replica_holder
+            replica_holder, replica_uri = holder, uri
+        replica_data_version = version
+        
+        # Readers still using the old copy keep it alive through their own connection
+        if old_holder is not None:
+            old_holder.close()
+
+def get_read_connection():
+    with replica_lock:
+        if replica_uri is not None:
+            return sqlite3.connect(replica_uri, uri=True)
+    return sqlite3.connect(DATABASE)
+
+def notify_database_write():
+    # Reads stay on disk until start_read_replica() has run, so there is no copy to refresh
+    if replica_uri is None:
+        return
+    
+    # The write is already committed; a failed refresh is retried by the poller
+    try:
+        refresh_read_replica()
+    except sqlite3.Error as e:
+        print(f'Read replica refresh failed: {e}')
+
+def replica_refresher():
+    while True:
+        socketio.sleep(REPLICA_MAX_STALENESS)
+        try:
+            # Only writes made outside the app move past the recorded version
+            with replica_refresh_lock:
+                version = replica_watcher.execute('PRAGMA data_version').fetchone()[0]
+            if version != replica_data_version:
+                refresh_read_replica()
+        except sqlite3.Error as e:
+            print(f'Read replica refresh failed: {e}')
+
+def start_read_replica():
+    refresh_read_replica()
+    socketio.start_background_task(replica_refresher)
 
 def init_db():
     conn = sqlite3.connect(DATABASE)
@@ -121,7 +209,7 @@ def handle_stats_update_request():
 
 # Helper functions to get data
 def get_seats_data():
-    conn = sqlite3.connect(DATABASE)
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -150,7 +238,7 @@ def get_seats_data():
     return seat_list
 
 def get_bookings_data():
-    conn = sqlite3.connect(DATABASE)
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     # Get today's date for filtering
@@ -202,7 +290,7 @@ def get_bookings_data():
     return booking_list
 
 def get_stats_data():
-    conn = get_db_connection()
+    conn = get_read_connection()
     
     # Get actual bookings count (only current date or future dates)
     today = datetime.now().strftime('%Y-%m-%d')
@@ -245,14 +333,127 @@ def get_stats_data():
         'available_seats': seats_count - occupied_seats
     }
 
+# Page delivery cache
+# The index and admin pages are static, so they are rendered once, compressed
+# and served from memory with strong ETags instead of re-rendering every hit.
+PAGE_CACHE = os.environ.get('PAGE_CACHE', '1') == '1'
+# Move inline <style>/<script> blocks into fingerprinted /assets/ files
+SPLIT_PAGE_ASSETS = os.environ.get('SPLIT_PAGE_ASSETS', '0') == '1'
+# Pages are revalidated with their ETag by default so deploys show up at once
+PAGE_MAX_AGE = int(os.environ.get('PAGE_MAX_AGE', 0))
+ASSET_MAX_AGE = 31536000
+
+PAGE_TEMPLATES = {
+    'index': 'index.html',
+    'admin': 'admin.html'
+}
+INLINE_BLOCK_RE = re.compile(r'<(script|style)>(.*?)</\1>', re.S)
+
+page_cache = {}
+asset_cache = {}
+page_cache_lock = threading.Lock()
+
+def make_cache_entry(text, mimetype):
+    body = text.encode('utf-8')
+    variants = {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9)
+    }
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    
+    return {
+        'mimetype': mimetype,
+        'etag': hashlib.sha256(body).hexdigest()[:32],
+        'variants': variants
+    }
+
+def split_inline_assets(name, html, assets):
+    def replace_block(match):
+        tag, content = match.group(1), match.group(2)
+        if tag == 'script':
+            entry = make_cache_entry(content, 'application/javascript')
+        else:
+            entry = make_cache_entry(content, 'text/css')
+        
+        extension = 'js' if tag == 'script' else 'css'
+        filename = f"{name}.{entry['etag'][:12]}.{extension}"
+        assets[filename] = entry
+        
+        if tag == 'script':
+            return f'<script src="/assets/{filename}"></script>'
+        return f'<link rel="stylesheet" href="/assets/{filename}">'
+    
+    return INLINE_BLOCK_RE.sub(replace_block, html)
+
+def build_page_cache():
+    global page_cache, asset_cache
+    
+    with page_cache_lock:
+        if page_cache:
+            return
+        
+        # Build into local dicts so requests never see a half-filled cache
+        pages = {}
+        assets = {}
+        with app.app_context():
+            for name, template in PAGE_TEMPLATES.items():
+                html = render_template(template)
+                if SPLIT_PAGE_ASSETS:
+                    html = split_inline_assets(name, html, assets)
+                pages[name] = make_cache_entry(html, 'text/html')
+        
+        # Publish assets first; pages referencing them are only served after
+        asset_cache = assets
+        page_cache = pages
+
+def send_cached(entry, cache_control):
+    # Honour the client's q-values; ties go to brotli, then gzip, then identity
+    available = [name for name in ('br', 'gzip', 'identity') if name in entry['variants']]
+    encoding = request.accept_encodings.best_match(available, default='identity')
+    
+    response = app.response_class(entry['variants'][encoding], mimetype=entry['mimetype'])
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    
+    # Each encoding is a different byte sequence, so it needs its own strong ETag
+    if encoding == 'identity':
+        response.set_etag(entry['etag'])
+    else:
+        response.set_etag(f"{entry['etag']}-{encoding}")
+    
+    return response.make_conditional(request)
+
+def serve_page(name):
+    if not PAGE_CACHE:
+        return render_template(PAGE_TEMPLATES[name])
+    
+    if name not in page_cache:
+        build_page_cache()
+    
+    if PAGE_MAX_AGE:
+        cache_control = f'public, max-age={PAGE_MAX_AGE}'
+    else:
+        cache_control = 'public, no-cache'
+    return send_cached(page_cache[name], cache_control)
+
 # Routes
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return serve_page('index')
 
 @app.route('/admin')
 def admin():
-    return render_template('admin.html')
+    return serve_page('admin')
+
+@app.route('/assets/<filename>')
+def page_asset(filename):
+    entry = asset_cache.get(filename)
+    if entry is None:
+        abort(404)
+    return send_cached(entry, f'public, max-age={ASSET_MAX_AGE}, immutable')
 
 @app.route('/api/seats')
 def get_seats():
@@ -260,25 +461,7 @@ def get_seats():
 
 @app.route('/api/shifts')
 def get_shifts():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM shifts')
-    shifts = cursor.fetchall()
-    conn.close()
-    
-    # Convert to dictionary format
-    shift_list = []
-    for shift in shifts:
-        shift_list.append({
-            'id': shift[0],
-            'name': shift[1],
-            'start_time': shift[2],
-            'end_time': shift[3],
-            'max_seats': shift[4]
-        })
-    
-    return jsonify(shift_list)
+    return jsonify(get_shifts_data())
 
 @app.route('/api/students')
 def get_students():
@@ -364,6 +547,7 @@ def book_seat():
         cursor.execute("UPDATE seats SET status = 'occupied' WHERE id = ?", (seat_id,))
         
         conn.commit()
+        notify_database_write()
         
         # Emit real-time updates
         seats_data = get_seats_data()
@@ -422,6 +606,7 @@ def cancel_booking():
         cursor.execute("UPDATE seats SET status = 'available' WHERE id = ?", (seat_id,))
         
         conn.commit()
+        notify_database_write()
         
         # Emit real-time updates
         seats_data = get_seats_data()
@@ -470,6 +655,7 @@ def add_shift():
         """, (name, start_time, end_time, int(max_seats)))
         
         conn.commit()
+        notify_database_write()
         
         # Emit real-time updates
         shifts_data = get_shifts_data()
@@ -517,6 +703,7 @@ def add_seat():
         """, (seat_number,))
         
         conn.commit()
+        notify_database_write()
         
         # Emit real-time updates
         seats_data = get_seats_data()
@@ -562,6 +749,7 @@ def delete_shift():
         cursor.execute("DELETE FROM shifts WHERE id = ?", (shift_id,))
         
         conn.commit()
+        notify_database_write()
         
         # Emit real-time updates
         shifts_data = get_shifts_data()
@@ -614,6 +802,7 @@ def delete_seat():
         cursor.execute("DELETE FROM seats WHERE id = ?", (seat_id,))
         
         conn.commit()
+        notify_database_write()
         
         # Emit real-time updates
         seats_data = get_seats_data()
@@ -641,7 +830,7 @@ def delete_seat():
 
 # Helper function to get shifts data
 def get_shifts_data():
-    conn = sqlite3.connect(DATABASE)
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     cursor.execute('SELECT * FROM shifts')
@@ -667,6 +856,10 @@ def health_check():
 
 if __name__ == '__main__':
     init_db()
+    if READ_REPLICA:
+        start_read_replica()
+    if PAGE_CACHE:
+        build_page_cache()
     # Small delay to ensure proper initialization
     import time
     time.sleep(1)